@@ -3,7 +3,6 @@ import * as cheerio from 'cheerio'; // Keep for title fallback
 import * as fs from 'fs';
 import * as path from 'path';
 import { URL } from 'url';
-import pLimit from 'p-limit';
 import { v4 as uuidv4 } from 'uuid';
 import puppeteer from 'puppeteer';
 
@@ -17,8 +16,10 @@ const LOG_FILE = path.resolve(process.cwd(), 'data', 'logs', 'workstream_crawler
 const ALL_URLS_LOG_FILE = path.resolve(process.cwd(), 'data', 'logs', 'workstream_all_encountered_urls.txt');
 const VISITED_URLS_LOG_FILE = path.resolve(process.cwd(), 'data', 'logs', 'workstream_visited_urls.txt');
 
-const MAX_CONCURRENCY = 2;
-const DELAY_MS = 2000;
+const MAX_CONCURRENCY = 2; // Number of worker loops pulling from the shared queue
+const DELAY_MS = 2000; // Per-worker pause between pages
+const IDLE_POLL_MS = 250; // How often an idle worker re-checks the queue while others are still crawling
+const TAB_RECYCLE_INTERVAL = 50; // Pages a worker crawls before replacing its tab to release renderer memory
 const PAGE_LOAD_TIMEOUT_MS = 90000;
 const EXPLICIT_WAIT_TIMEOUT_MS = 40000; // Increased wait slightly more
 const REQUEST_TIMEOUT_MS = 30000;
@@ -26,6 +27,10 @@ const MAX_QUEUE_SIZE = 50000;
 const MIN_CONTENT_LENGTH = 100;
 
 const USER_AGENT = 'SalesKnowledgeAssistantCrawler/1.0 (+https://your-contact-info.com)';
+// Subresources the extractors never read. Scripts and XHR/fetch are still allowed since the
+// knowledge base renders its articles and link tiles client-side.
+const BLOCKED_RESOURCE_TYPES = new Set(['image', 'media', 'font', 'stylesheet']);
+const LOG_LEVEL = process.env.CRAWLER_LOG_LEVEL || 'info'; // Set to 'debug' for per-link/per-selector tracing
 // --- End Configuration ---
 
 // --- Directory Setup & Logging (Same as before) ---
@@ -34,52 +39,96 @@ fs.mkdirSync(path.dirname(PDF_LOG_FILE), { recursive: true });
 fs.mkdirSync(PDF_DOWNLOAD_DIR, { recursive: true });
 fs.mkdirSync(path.dirname(LOG_FILE), { recursive: true });
 const logStream = fs.createWriteStream(LOG_FILE, { flags: 'a' });
-const log = (level, message, data) => { /* ... same logging function ... */
+// Record outputs stay open for the whole crawl; each save is a buffered append.
+const htmlOutputStream = fs.createWriteStream(HTML_OUTPUT_FILE, { flags: 'a' });
+const pdfLogStream = fs.createWriteStream(PDF_LOG_FILE, { flags: 'a' });
+const LEVEL_PRIORITY = Object.freeze({ debug: 10, info: 20, warn: 30, error: 40 });
+const MIN_LOG_PRIORITY = LEVEL_PRIORITY[LOG_LEVEL] ?? LEVEL_PRIORITY.info;
+const isLogEnabled = (level) => (LEVEL_PRIORITY[level] ?? LEVEL_PRIORITY.info) >= MIN_LOG_PRIORITY;
+// Lines below LOG_LEVEL are dropped before any formatting or console/file write; debug
+// lines fire several times per link, and console.log is a synchronous write on a TTY.
+const log = (level, message, data) => {
+    if (!isLogEnabled(level)) return;
     const timestamp = new Date().toISOString();
     const levelUpper = level.toUpperCase();
     const logEntry = `[${timestamp}] [${levelUpper}] ${message}`;
     console.log(logEntry);
-    logStream.write(logEntry + '\n');
+    const toFile = !logStream.writableEnded; // Once shutdown has ended the log stream, console output only
+    if (toFile) logStream.write(logEntry + '\n');
     if (data) {
-        const dataStr = (typeof data === 'string' || data instanceof Error) ? String(data) : JSON.stringify(data, null, 2);
-        logStream.write(dataStr + '\n');
+        const dataStr = (typeof data === 'string' || data instanceof Error) ? String(data) : JSON.stringify(data);
+        if (toFile) logStream.write(dataStr + '\n');
         if (level === 'error' && data instanceof Error) {
             console.error(data.stack || data);
-            logStream.write((data.stack || '') + '\n');
+            if (toFile) logStream.write((data.stack || '') + '\n');
         } else if (level === 'error') {
             console.error(data);
         }
     }
 };
 
+// Write failures (e.g. disk full) surface asynchronously as 'error' events, which the
+// try/catch in saveHtmlData/savePdfLog cannot see. The failed stream is destroyed, so
+// appendJsonLine drops (and saveHtmlData stops counting) every record after it.
+htmlOutputStream.on('error', e => log('error', `Failed writing HTML output to ${HTML_OUTPUT_FILE}; further records will be dropped`, e));
+pdfLogStream.on('error', e => log('error', `Failed writing PDF log to ${PDF_LOG_FILE}; further entries will be dropped`, e));
+
 // --- Global State (Same as before) ---
 const visitedUrls = new Set();
 const allEncounteredUrls = new Set();
 const queue = [];
-const limit = pLimit(MAX_CONCURRENCY);
+let activeWorkers = 0;
 let htmlCrawlCount = 0;
 let pdfDownloadCount = 0;
 let browser = null;
+let shuttingDown = false; // Set by finalizeCrawl() so workers stop taking new URLs
 
 
 // --- Helper Functions ---
 
-// Function isAllowed (with internal logging)
-function isAllowed(url) { /* ... same isAllowed function ... */
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+const ALLOWED_PROTOCOLS = new Set(['http:', 'https:']);
+const EXCLUDED_EXTENSION_RE = /\.(zip|jpg|jpeg|png|gif|css|js|mp4|mov|avi|woff|woff2|svg|ico)$/i;
+const EXCLUDED_PATH_PREFIXES = ['/sfsites/c/resource/', '/sfsites/l/'];
+const IS_ALLOWED_CACHE_MAX = 200000;
+// The same nav/tile links appear on nearly every page, so verdicts are memoized per URL.
+const isAllowedCache = new Map();
+
+// Function isAllowed (memoized; the reason for a rejection is logged the first time a URL is seen)
+function isAllowed(url) {
     if (!url) return false;
+    let allowed = isAllowedCache.get(url);
+    if (allowed === undefined) {
+        allowed = checkAllowed(url);
+        if (isAllowedCache.size >= IS_ALLOWED_CACHE_MAX) isAllowedCache.clear();
+        isAllowedCache.set(url, allowed);
+    }
+    return allowed;
+}
+
+function checkAllowed(url) {
     try {
         const parsedUrl = new URL(url);
-        if (!['http:', 'https:'].includes(parsedUrl.protocol)) { log('debug', `isAllowed: FALSE (protocol) - ${url}`); return false; }
+        if (!ALLOWED_PROTOCOLS.has(parsedUrl.protocol)) { log('debug', `isAllowed: FALSE (protocol) - ${url}`); return false; }
         if (parsedUrl.hostname !== ALLOWED_DOMAIN) { log('debug', `isAllowed: FALSE (domain) - ${url}`); return false; }
         const pathname = parsedUrl.pathname.toLowerCase();
-        if (/\.(zip|jpg|jpeg|png|gif|css|js|mp4|mov|avi|woff|woff2|svg|ico)$/i.test(pathname) ||
-            pathname.startsWith('/sfsites/c/resource/') || pathname.startsWith('/sfsites/l/')) {
+        if (EXCLUDED_EXTENSION_RE.test(pathname) || EXCLUDED_PATH_PREFIXES.some(prefix => pathname.startsWith(prefix))) {
             log('debug', `isAllowed: FALSE (file/resource path) - ${url}`); return false;
         }
         log('debug', `isAllowed: TRUE - ${url}`); return true;
     } catch (error) { log('warn', `Invalid URL encountered during isAllowed check: ${url}`, error); return false; }
 }
 
+// Resolves an href against the page URL and drops the fragment with a single parse.
+// Returns null for non-http(s) links; throws (like new URL) if the href is unparsable.
+function canonicalizeUrl(href, baseUrl) {
+    const urlObj = new URL(href, baseUrl);
+    if (!ALLOWED_PROTOCOLS.has(urlObj.protocol)) return null;
+    urlObj.hash = '';
+    return urlObj.href;
+}
+
 // Add START_URL *after* defining isAllowed
 if (isAllowed(START_URL)) { queue.push(START_URL); allEncounteredUrls.add(START_URL); }
 else { log('error', `START_URL ${START_URL} is not allowed.`); process.exit(1); }
@@ -91,13 +140,27 @@ async function extractDataPuppeteer(page, url) { /* ... same extractDataPuppetee
         log('debug', `Attempting data extraction via page.evaluate for: ${url}`);
         const extractedData = await page.evaluate((MIN_CONTENT_LENGTH_BROWSER) => {
             let content = ''; let title = '';
-            function getTextRecursive(element) { /* ... */ } // Keep recursive helper
+            // A native TreeWalker over text nodes (no layout pass, unlike innerText). Text nodes are
+            // joined with ' ' because LWC/Aura render no whitespace between sibling elements, so
+            // textContent would glue <li>/<p>/<td> contents together; open shadow roots are
+            // walked too. Whitespace is collapsed once per candidate so the fallback checks reuse it.
+            // Inline JS/CSS is often larger than the article itself; the filter skips those subtrees.
+            const SKIPPED_TAGS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT']);
+            const textFilter = { acceptNode: (node) => (SKIPPED_TAGS.has(node.nodeName) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT) };
+            const collectText = (root, parts) => {
+                const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, textFilter);
+                for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+                    if (node.nodeType === Node.TEXT_NODE) parts.push(node.nodeValue);
+                    else if (node.shadowRoot) collectText(node.shadowRoot, parts);
+                }
+                return parts;
+            };
+            const readText = (element) => (element ? collectText(element, []).join(' ').replace(/\s+/g, ' ').trim() : '');
             const articleContentEl = document.querySelector('.slds-rich-text-editor__output');
-            if (articleContentEl) { /* ... */ }
-            if (!content || content.replace(/\s+/g, ' ').trim().length < MIN_CONTENT_LENGTH_BROWSER) { /* ... main fallback ... */ }
-            if (!content || content.replace(/\s+/g, ' ').trim().length < MIN_CONTENT_LENGTH_BROWSER) { /* ... body fallback ... */ }
+            if (articleContentEl) { content = readText(articleContentEl); }
+            if (content.length < MIN_CONTENT_LENGTH_BROWSER) { content = readText(document.querySelector('main')); }
+            if (content.length < MIN_CONTENT_LENGTH_BROWSER) { content = readText(document.body); }
             title = title || document.title;
-            content = content.replace(/[\s\n\r]+/g, ' ').trim();
             return { title, content };
         }, MIN_CONTENT_LENGTH);
         if (!extractedData || !extractedData.content || extractedData.content.length < MIN_CONTENT_LENGTH) { /* ... minimal content log ... */ return null; }
@@ -107,78 +170,119 @@ async function extractDataPuppeteer(page, url) { /* ... same extractDataPuppetee
 }
 
 
-// *** MODIFIED: findLinks using TARGETED page.$$eval calls ***
+// Link areas on the knowledge base. They are matched as one comma-separated selector so the
+// DOM is walked once per page with a single $$eval round trip, instead of once per selector.
+const LINK_SELECTORS = [
+    'a.comm-tile-menu__item-link',                 // Homepage tiles
+    'a.article-link',                              // Topic page article links
+    '.slds-rich-text-editor__output a',            // Links within article content
+    'nav.forceCommunityThemeNav a',                // Main navigation links
+    '.forceCommunityRelatedListPlaceholder a',     // Related list links (if any)
+    '.forceCommunityRelatedListContainer a',       // Related list links (alternative)
+    'a.forceTopicTopicLink'                        // Breadcrumb/topic links
+    // Add more specific selectors if other link areas are identified
+];
+const LINK_SELECTOR = LINK_SELECTORS.join(', ');
+
+// *** MODIFIED: findLinks using a single TARGETED page.$$eval call ***
 async function findLinksPuppeteerTargeted(page, baseUrl) {
     const links = new Set();
-    const selectorsToTry = [
-        'a.comm-tile-menu__item-link',                 // Homepage tiles
-        'a.article-link',                              // Topic page article links
-        '.slds-rich-text-editor__output a',            // Links within article content
-        'nav.forceCommunityThemeNav a',                // Main navigation links
-        '.forceCommunityRelatedListPlaceholder a',     // Related list links (if any)
-        '.forceCommunityRelatedListContainer a',       // Related list links (alternative)
-        'a.forceTopicTopicLink'                        // Breadcrumb/topic links
-        // Add more specific selectors if other link areas are identified
-    ];
 
     log('debug', `Attempting link extraction via TARGETED page.$$eval for: ${baseUrl}`);
-    let totalRawHrefs = 0;
-
-    for (const selector of selectorsToTry) {
-        try {
-            log('debug', `Evaluating selector: ${selector}`);
-            const hrefs = await page.$$eval(selector, anchors => anchors.map(a => a.href));
-            totalRawHrefs += hrefs.length;
-            log('debug', `Found ${hrefs.length} raw hrefs for selector "${selector}": ${JSON.stringify(hrefs)}`);
-
-            for (const href of hrefs) {
-                if (href) {
-                    try {
-                        const absoluteUrl = new URL(href, baseUrl).toString();
-                        const urlObj = new URL(absoluteUrl);
-                        if (!['http:', 'https:'].includes(urlObj.protocol)) continue;
-                        urlObj.hash = '';
-                        const cleanUrl = urlObj.toString();
-                        if (isAllowed(cleanUrl)) {
-                            // isAllowed logs TRUE internally
-                            links.add(cleanUrl);
-                        } else {
-                            // isAllowed logs FALSE internally with reason
-                        }
-                    } catch (e) {
-                        log('debug', `Ignoring invalid/unparsable raw href: ${href} from selector "${selector}" on ${baseUrl}`, e.message);
-                    }
+    let hrefs;
+    try {
+        hrefs = await page.$$eval(LINK_SELECTOR, anchors => anchors.map(a => a.href));
+    } catch (error) {
+        if (error.message.includes('Execution context was destroyed')) {
+            log('warn', `Caught 'Execution context destroyed' during link evaluate on ${baseUrl}. Links on this page will be missed.`);
+        } else {
+            log('error', `Error finding links via page.$$eval on ${baseUrl}`, error);
+        }
+        return [];
+    }
+    if (isLogEnabled('debug')) { log('debug', `Found ${hrefs.length} raw hrefs for targeted selectors: ${JSON.stringify(hrefs)}`); }
+
+    for (const href of hrefs) {
+        if (href) {
+            try {
+                const cleanUrl = canonicalizeUrl(href, baseUrl);
+                if (!cleanUrl) continue;
+                if (isAllowed(cleanUrl)) {
+                    // isAllowed logs TRUE internally
+                    links.add(cleanUrl);
                 } else {
-                     log('debug', `Ignoring empty raw href from selector "${selector}" on ${baseUrl}`);
+                    // isAllowed logs FALSE internally with reason
                 }
+            } catch (e) {
+                log('debug', `Ignoring invalid/unparsable raw href: ${href} on ${baseUrl}`, e.message);
             }
-        } catch (error) {
-            // Handle potential errors during evaluation for a specific selector
-            if (error.message.includes('Execution context was destroyed')) {
-                 log('warn', `Caught 'Execution context destroyed' during evaluate for selector "${selector}" on ${baseUrl}. Some links might be missed.`);
-                 // Continue to the next selector if possible
-            } else if (error.message.includes('failed to find element matching selector')) {
-                log('debug', `Selector "${selector}" not found on ${baseUrl}. Skipping.`);
-            }
-             else {
-                log('error', `Error finding links via page.$$eval for selector "${selector}" on ${baseUrl}`, error);
-            }
+        } else {
+             log('debug', `Ignoring empty raw href on ${baseUrl}`);
         }
-    } // End loop through selectors
+    }
 
-    log('debug', `Finished evaluating all targeted selectors. Total raw hrefs found: ${totalRawHrefs}`);
+    log('debug', `Finished evaluating targeted selectors. Total raw hrefs found: ${hrefs.length}`);
     return Array.from(links);
 }
 
 
-// Function saveHtmlData (same as before)
-function saveHtmlData(data) { /* ... */ }
-// Function savePdfLog (same as before)
-function savePdfLog(pdfInfo) { /* ... */ }
+// Output files are JSON Lines: one compact JSON.stringify per record (no indentation),
+// so each save costs only that record's serialization.
+// Returns false if the record was dropped because the stream has ended or failed.
+function appendJsonLine(stream, record) {
+    if (stream.writableEnded) return false; // Late write from a worker still running during SIGINT shutdown
+    if (stream.destroyed) return false; // An earlier write failed; see the 'error' listeners above
+    stream.write(JSON.stringify(record) + '\n');
+    return true;
+}
+
+function saveHtmlData(data) {
+    try {
+        if (appendJsonLine(htmlOutputStream, data)) htmlCrawlCount++;
+    } catch (error) { log('error', `Failed to save HTML data for ${data.url}`, error); }
+}
+
+function savePdfLog(pdfInfo) {
+    try { appendJsonLine(pdfLogStream, pdfInfo); }
+    catch (error) { log('error', `Failed to write PDF log entry for ${pdfInfo.url}`, error); }
+}
 
 // --- Core Crawling Logic ---
 
-async function crawlPage(url) {
+// Opens a tab configured for crawling. Each worker keeps one of these and reuses it
+// across URLs instead of paying for a new renderer target (and re-registering the
+// interception handler) on every page.
+async function openCrawlerPage() {
+  const page = await browser.newPage();
+  await page.setUserAgent(USER_AGENT);
+  await page.setViewport({ width: 1366, height: 768 });
+  await page.setRequestInterception(true);
+  page.on('request', (req) => {
+    const action = BLOCKED_RESOURCE_TYPES.has(req.resourceType()) ? req.abort() : req.continue();
+    action.catch(e => log('debug', `Request interception failed for ${req.url()}`, e.message));
+  });
+  return page;
+}
+
+// Returns the worker's tab, (re)opening it if it was never created or has been closed.
+async function getWorkerPage(worker) {
+  if (!worker.page || worker.page.isClosed()) {
+    log('debug', `Worker ${worker.id}: opening a new browser tab.`);
+    worker.page = await openCrawlerPage();
+  }
+  return worker.page;
+}
+
+// Closes the worker's tab so that the next URL starts from a fresh one.
+async function discardWorkerPage(worker, reason) {
+  const page = worker.page;
+  worker.page = null;
+  if (page && !page.isClosed()) {
+    await page.close().catch(e => log('error', `Error closing page ${reason}`, e));
+  }
+}
+
+async function crawlPage(url, worker) {
   if (visitedUrls.has(url)) { log('debug', `Already visited: ${url}`); return; }
   log('info', `Crawling: ${url}`);
   visitedUrls.add(url);
@@ -193,16 +297,15 @@ async function crawlPage(url) {
 
     // --- Puppeteer Crawl ---
     log('debug', `Using Puppeteer for: ${url}`);
-    page = await browser.newPage();
-    await page.setUserAgent(USER_AGENT);
-    await page.setViewport({ width: 1366, height: 768 });
-    await page.setRequestInterception(true);
-    page.on('request', (req) => { /* ... same request interception ... */ });
+    page = await getWorkerPage(worker);
 
     let response;
     try {
         log('debug', `Navigating browser to: ${url}`);
-        response = await page.goto(url, { waitUntil: 'load', timeout: PAGE_LOAD_TIMEOUT_MS });
+        // Resolve as soon as the document is parsed: the content-type check below needs only the
+        // main response, and HTML pages are then gated on waitForSelector rather than on every
+        // subresource finishing under the 'load' event.
+        response = await page.goto(url, { waitUntil: 'domcontentloaded', timeout: PAGE_LOAD_TIMEOUT_MS });
     } catch (gotoError) { /* ... goto error handling ... */ }
 
     const status = response.status();
@@ -228,12 +331,12 @@ async function crawlPage(url) {
       }
 
       // *** Use targeted Puppeteer functions for extraction ***
-      const extracted = await extractDataPuppeteer(page, finalUrl); // Keep using evaluate for content
-      const newLinks = await findLinksPuppeteerTargeted(page, finalUrl); // Use targeted $$eval for links
-
-      // Close page ASAP
-      if (page && !page.isClosed()) await page.close().catch(e => log('error', 'Error closing page after evaluations', e));
-      page = null;
+      // Content and link extraction only read the DOM and neither depends on the other, so
+      // both protocol round trips are issued together instead of back to back.
+      const [extracted, newLinks] = await Promise.all([
+        extractDataPuppeteer(page, finalUrl), // Keep using evaluate for content
+        findLinksPuppeteerTargeted(page, finalUrl), // Use targeted $$eval for links
+      ]);
 
       // Process results
       if (extracted) { saveHtmlData(extracted); }
@@ -242,71 +345,140 @@ async function crawlPage(url) {
       if (newLinks.length === 0) { log('warn', `Found 0 processable links via TARGETED $$eval on HTML page: ${finalUrl}`); }
       else { log('info', `Found ${newLinks.length} potential links via TARGETED $$eval on: ${finalUrl}`); }
 
-      for (const link of newLinks) {
-        if (!visitedUrls.has(link) && !queue.includes(link)) {
-          if (queue.length < MAX_QUEUE_SIZE) { queue.push(link); allEncounteredUrls.add(link); }
-          else { log('warn', 'Queue size limit reached, not adding more links.'); break; }
-        }
-      }
+      // allEncounteredUrls holds every URL ever queued, so it doubles as an O(1) "already
+      // queued" check (a URL that was queued once is never re-queued, even if still pending).
+      // newLinks is already de-duplicated, so filter once and enqueue the survivors in one batch.
+      const freshLinks = newLinks.filter(link => !visitedUrls.has(link) && !allEncounteredUrls.has(link));
+      const room = Math.max(MAX_QUEUE_SIZE - queue.length, 0);
+      const acceptedLinks = freshLinks.length > room ? freshLinks.slice(0, room) : freshLinks;
+      if (acceptedLinks.length < freshLinks.length) { log('warn', 'Queue size limit reached, not adding more links.'); }
+      queue.push(...acceptedLinks);
+      for (const link of acceptedLinks) { allEncounteredUrls.add(link); }
+      log('debug', `Queued ${acceptedLinks.length} new links from: ${finalUrl}`);
 
     } else {
       log('info', `Skipping unsupported content type via Puppeteer at ${finalUrl} (Type: ${contentType})`);
-      if (page && !page.isClosed()) await page.close().catch(e => log('error', 'Error closing page for unsupported type', e));
-      page = null;
     }
 
   } catch (error) {
     log('error', `Unhandled error during Puppeteer crawl for ${url} (Final URL: ${page?.url() || 'N/A'})`, error);
-    if (page && !page.isClosed()) {
-      await page.close().catch(e => log('error', 'Error closing page after main crawl error', e));
+    // The tab may be wedged (crashed renderer, hung navigation); start the next URL on a fresh one.
+    await discardWorkerPage(worker, 'after main crawl error');
+  }
+}
+
+// --- Worker Pool ---
+// Each worker pulls the next URL from the shared queue, so a page's links become
+// available to every worker as soon as it is processed. A worker only exits once the
+// queue is empty AND no other worker is still crawling (which could enqueue more links).
+async function crawlWorker(workerId) {
+  const worker = { id: workerId, page: null, pagesCrawled: 0 };
+  try {
+    await crawlLoop(worker);
+  } finally {
+    await discardWorkerPage(worker, `for worker ${workerId} on exit`);
+  }
+}
+
+async function crawlLoop(worker) {
+  const workerId = worker.id;
+  while (true) {
+    if (shuttingDown) { log('debug', `Worker ${workerId}: shutdown requested, exiting.`); return; }
+    if (!browser || !browser.isConnected()) { log('error', `Worker ${workerId}: browser is not connected. Stopping.`); return; }
+    const currentUrl = queue.shift();
+    if (currentUrl === undefined) {
+      if (activeWorkers === 0) { log('debug', `Worker ${workerId}: queue drained, exiting.`); return; }
+      await sleep(IDLE_POLL_MS);
+      continue;
+    }
+    if (visitedUrls.has(currentUrl)) { continue; }
+    allEncounteredUrls.add(currentUrl);
+    activeWorkers++;
+    try {
+      await crawlPage(currentUrl, worker);
+    } catch (err) {
+      log('error', `Unhandled error in worker ${workerId} for ${currentUrl}`, err);
+    } finally {
+      activeWorkers--;
     }
+    // A long-lived tab keeps growing its JS heap and DOM caches across navigations;
+    // closing it periodically hands that memory back instead of holding it for the whole crawl.
+    worker.pagesCrawled++;
+    if (worker.pagesCrawled % TAB_RECYCLE_INTERVAL === 0) { await discardWorkerPage(worker, 'for periodic recycling'); }
+    if (visitedUrls.size % 20 === 0) { log('info', `Queue size: ${queue.length}, Visited: ${visitedUrls.size}, Active workers: ${activeWorkers}`); }
+    await sleep(DELAY_MS);
   }
 }
 
-// --- Main Execution (Same as before, including final logging) ---
+// --- Main Execution ---
 async function startCrawling() {
   log('info', 'Crawler starting with Puppeteer (Targeted Evaluate for Links)...');
   log('warn', 'ROBOTS.TXT CHECK IS CURRENTLY DISABLED.');
   try {
       log('info', 'Launching browser...');
-      browser = await puppeteer.launch({ headless: true, args: ['--no-sandbox','--disable-setuid-sandbox','--disable-dev-shm-usage','--disable-accelerated-2d-canvas','--no-zygote','--disable-gpu'] });
+      // handleSIGINT: false - Puppeteer's own listener would kill Chrome and exit the process
+      // before our SIGINT handler has flushed the output streams.
+      browser = await puppeteer.launch({ headless: true, handleSIGINT: false, args: ['--no-sandbox','--disable-setuid-sandbox','--disable-dev-shm-usage','--disable-accelerated-2d-canvas','--no-zygote','--disable-gpu'] });
       log('info', `Browser launched successfully. PID: ${browser.process()?.pid || 'N/A'}`);
-      browser.on('disconnected', () => { log('error', 'BROWSER DISCONNECTED UNEXPECTEDLY. Crawler may stop.'); browser = null; });
-      const crawlPromises = [];
-      while (queue.length > 0) {
-          if (!browser || !browser.isConnected()) { log('error', 'Browser is not connected. Stopping crawl loop.'); break; }
-          const currentUrl = queue.shift();
-          if (visitedUrls.has(currentUrl)) { continue; }
-          allEncounteredUrls.add(currentUrl);
-          const promise = limit(() => crawlPage(currentUrl)).catch(err => log('error', `Unhandled error in limited task for ${currentUrl}`, err));
-          crawlPromises.push(promise);
-          if (visitedUrls.size % 20 === 0 && visitedUrls.size > 0) { log('info', `Queue size: ${queue.length}, Visited: ${visitedUrls.size}, Active tasks: ${limit.activeCount}`); }
-          await new Promise(resolve => setTimeout(resolve, DELAY_MS));
-      }
-      log('info', `Queue empty or browser disconnected. Waiting for ${limit.activeCount} active tasks to finish...`);
-      await Promise.all(crawlPromises).catch(err => log('error', 'Error during Promise.all wait', err));
-      log('info', 'All submitted crawl tasks have completed or errored.');
+      browser.on('disconnected', () => {
+        if (!shuttingDown) { log('error', 'BROWSER DISCONNECTED UNEXPECTEDLY. Crawler may stop.'); }
+        browser = null;
+      });
+      log('info', `Starting ${MAX_CONCURRENCY} crawl workers...`);
+      const workers = Array.from({ length: MAX_CONCURRENCY }, (_, i) => crawlWorker(i + 1));
+      await Promise.all(workers);
+      log('info', 'All crawl workers have finished.');
   } catch (error) { log('error', 'Fatal error during crawling setup or execution', error); }
   finally {
-      try { log('info', `Writing ${visitedUrls.size} visited URLs to ${VISITED_URLS_LOG_FILE}`); fs.writeFileSync(VISITED_URLS_LOG_FILE, Array.from(visitedUrls).join('\n')); }
-      catch (e) { log('error', 'Failed to write visited URLs file', e); }
-      try { log('info', `Writing ${allEncounteredUrls.size} encountered URLs to ${ALL_URLS_LOG_FILE}`); fs.writeFileSync(ALL_URLS_LOG_FILE, Array.from(allEncounteredUrls).join('\n')); }
-      catch (e) { log('error', 'Failed to write all encountered URLs file', e); }
-      if (browser && browser.isConnected()) { /* ... browser close logic ... */ }
-      else { /* ... */ }
-      const missedCount = allEncounteredUrls.size - visitedUrls.size;
-      log('info', `Crawling finished.`);
-      log('info', `>> Total URLs Encountered: ${allEncounteredUrls.size} (see ${ALL_URLS_LOG_FILE})`);
-      log('info', `>> Total URLs Visited & Processed: ${visitedUrls.size} (see ${VISITED_URLS_LOG_FILE})`);
-      log('info', `>> Potential Missed/Errored URLs: ${missedCount}`);
-      log('info', `>> Saved HTML Pages (Full Content): ${htmlCrawlCount}`);
-      log('info', `>> Downloaded PDFs: ${pdfDownloadCount}`);
-      logStream.end();
+      await finalizeCrawl();
   }
 }
 
+// --- Shutdown ---
+
+// Writes via a temp file + rename, so an interrupted shutdown never leaves a truncated list.
+function writeFileAtomic(filePath, contents) {
+  const tmpPath = `${filePath}.tmp`;
+  fs.writeFileSync(tmpPath, contents);
+  fs.renameSync(tmpPath, filePath);
+}
+
+const endStream = (stream) => new Promise(resolve => stream.end(resolve));
+
+let finalizePromise = null;
+// Shared by normal completion and SIGINT, and runs at most once. Page records were streamed
+// as they were crawled, so shutdown only writes the URL lists, flushes the open streams and
+// closes the browser.
+function finalizeCrawl() {
+  shuttingDown = true;
+  if (!finalizePromise) { finalizePromise = writeFinalOutputs(); }
+  return finalizePromise;
+}
+
+async function writeFinalOutputs() {
+  try { log('info', `Writing ${visitedUrls.size} visited URLs to ${VISITED_URLS_LOG_FILE}`); writeFileAtomic(VISITED_URLS_LOG_FILE, Array.from(visitedUrls).join('\n')); }
+  catch (e) { log('error', 'Failed to write visited URLs file', e); }
+  try { log('info', `Writing ${allEncounteredUrls.size} encountered URLs to ${ALL_URLS_LOG_FILE}`); writeFileAtomic(ALL_URLS_LOG_FILE, Array.from(allEncounteredUrls).join('\n')); }
+  catch (e) { log('error', 'Failed to write all encountered URLs file', e); }
+  const missedCount = allEncounteredUrls.size - visitedUrls.size;
+  log('info', `Crawling finished.`);
+  log('info', `>> Total URLs Encountered: ${allEncounteredUrls.size} (see ${ALL_URLS_LOG_FILE})`);
+  log('info', `>> Total URLs Visited & Processed: ${visitedUrls.size} (see ${VISITED_URLS_LOG_FILE})`);
+  log('info', `>> Potential Missed/Errored URLs: ${missedCount}`);
+  log('info', `>> Saved HTML Pages (Full Content): ${htmlCrawlCount}`);
+  log('info', `>> Downloaded PDFs: ${pdfDownloadCount}`);
+  await Promise.all([endStream(htmlOutputStream), endStream(pdfLogStream)]);
+  await endStream(logStream);
+  // Closed after the streams have flushed; a still-connected browser keeps Node running after a normal finish.
+  await browser?.close().catch(e => log('error', 'Error closing browser during shutdown', e));
+}
+
 // --- Execute (Same as before) ---
 startCrawling().catch(error => { /* ... */ });
-process.on('SIGINT', async () => { /* ... */ });
+process.on('SIGINT', async () => {
+  log('warn', 'SIGINT received. Flushing crawl output and exiting...');
+  await finalizeCrawl();
+  process.exit(130);
+});
 process.on('uncaughtException', (error, origin) => { /* ... */ });
 process.on('unhandledRejection', (reason, promise) => { /* ... */ });
\ No newline at end of file